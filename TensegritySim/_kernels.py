@@ -0,0 +1,269 @@
+"""
+Numerical kernels used by the TensegritySolver.
+
+The kernels are compiled with numba when it is installed (pip install TensegritySim[numba]).
+Without numba, equivalent vectorized NumPy implementations are used instead.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange, get_num_threads
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        # The decorated kernels are only called when numba is installed
+        return lambda func: func
+
+# Smallest number of connections given to a thread, below this the threading overhead dominates
+BLOCK_SIZE = 64
+
+
+@njit(inline="always", fastmath=True)
+def _assemble_block(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string, out, diff, seg_length, c_start, c_end, dim):
+    """
+    Adds the virtual work from the spring potential energy of connections c_start to c_end to out.
+    The difference and length of each segment are stored in diff and seg_length by the length pass
+    and reused by the derivative pass. dim is passed as a literal by the specialized kernels so
+    the inner loops are unrolled.
+    """
+    for c in range(c_start, c_end):
+        # current length
+        length = 0.0
+        for e in range(conn_offsets[c], conn_offsets[c+1]):
+            sq = 0.0
+            for k in range(dim):
+                d = N[edge_i[e], k] - N[edge_j[e], k]
+                diff[e, k] = d
+                sq += d*d
+            seg_length[e] = np.sqrt(sq)
+            length += seg_length[e]
+
+        if is_string[c] and length < L0[c]: # string connections cannot store energy when compressed
+            continue
+
+        C = -stiffness[c] * (length - L0[c])
+
+        # C * dl/dq
+        for e in range(conn_offsets[c], conn_offsets[c+1]):
+            if seg_length[e] == 0:
+                continue
+            scale = C / seg_length[e]
+            for k in range(dim):
+                w = scale * diff[e, k]
+                out[edge_i[e]*dim + k] += w
+                out[edge_j[e]*dim + k] -= w
+
+
+@njit(parallel=True, cache=True, fastmath=True)
+def _assemble_2d(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string, out, n_blocks):
+    """
+    Adds the virtual work from the spring potential energy of all connections to out, for 2D node positions.
+
+    Args:
+        N (np.ndarray): The (n_nodes, 2) node positions.
+        edge_i (np.ndarray): The first node index of each segment.
+        edge_j (np.ndarray): The second node index of each segment.
+        conn_offsets (np.ndarray): The segments of connection c are edge_i/edge_j[conn_offsets[c]:conn_offsets[c+1]].
+        stiffness (np.ndarray): The stiffness of each connection.
+        L0 (np.ndarray): The rest length of each connection.
+        is_string (np.ndarray): Whether each connection is a string.
+        out (np.ndarray): The flat (n_nodes*2) virtual work array that is added to.
+        n_blocks (int): The number of blocks of connections to run in parallel.
+    """
+    n_connections = len(stiffness)
+    diff = np.empty((len(edge_i), 2), N.dtype)
+    seg_length = np.empty(len(edge_i), N.dtype)
+
+    # The connections are split into contiguous blocks that run in parallel, each block adds to its own
+    # copy of out (so threads never write to the same memory) and the copies are summed at the end.
+    # The segments of a block are contiguous too, so the blocks share diff and seg_length.
+    block_out = np.zeros((n_blocks, out.size), out.dtype)
+    for b in prange(n_blocks):
+        _assemble_block(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string, block_out[b], diff, seg_length,
+                        b*n_connections // n_blocks, (b + 1)*n_connections // n_blocks, 2)
+
+    for b in range(n_blocks):
+        for i in range(out.size):
+            out[i] += block_out[b, i]
+
+
+@njit(parallel=True, cache=True, fastmath=True)
+def _assemble_3d(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string, out, n_blocks):
+    """
+    Adds the virtual work from the spring potential energy of all connections to out, for 3D node positions.
+    Same arguments as _assemble_2d.
+    """
+    n_connections = len(stiffness)
+    diff = np.empty((len(edge_i), 3), N.dtype)
+    seg_length = np.empty(len(edge_i), N.dtype)
+
+    block_out = np.zeros((n_blocks, out.size), out.dtype)
+    for b in prange(n_blocks):
+        _assemble_block(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string, block_out[b], diff, seg_length,
+                        b*n_connections // n_blocks, (b + 1)*n_connections // n_blocks, 3)
+
+    for b in range(n_blocks):
+        for i in range(out.size):
+            out[i] += block_out[b, i]
+
+
+def _assemble_virtual_work_numpy(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string, out):
+    """
+    Adds the virtual work from the spring potential energy of all connections to out (vectorized NumPy).
+    Same arguments as _assemble_2d, without n_blocks.
+    """
+    edge_conn = np.repeat(np.arange(len(stiffness)), np.diff(conn_offsets)) # connection of each segment
+
+    diff = N[edge_i] - N[edge_j]
+    seg_length = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+    length = np.bincount(edge_conn, weights=seg_length, minlength=len(stiffness))
+
+    # Only active connections do virtual work: string connections cannot store energy when compressed
+    active = ~(is_string & (length < L0))
+    active_edges = active[edge_conn] & (seg_length > 0)
+    edge_conn = edge_conn[active_edges]
+
+    C = -stiffness[edge_conn] * (length[edge_conn] - L0[edge_conn]) / seg_length[active_edges]
+    segment_work = C[:, None] * diff[active_edges]
+
+    out = out.reshape(N.shape)
+    np.add.at(out, edge_i[active_edges], segment_work)
+    np.add.at(out, edge_j[active_edges], -segment_work)
+
+
+@njit(cache=True, fastmath=True)
+def _connection_lengths(N, edge_i, edge_j, conn_offsets, out):
+    """
+    Computes the current length of every connection into out.
+    Same arguments as connection_lengths.
+    """
+    for c in range(len(conn_offsets) - 1):
+        length = 0.0
+        for e in range(conn_offsets[c], conn_offsets[c+1]):
+            sq = 0.0
+            for k in range(N.shape[1]):
+                d = N[edge_i[e], k] - N[edge_j[e], k]
+                sq += d*d
+            length += np.sqrt(sq)
+        out[c] = length
+
+
+def _connection_lengths_numpy(N, edge_i, edge_j, conn_offsets, out):
+    """
+    Computes the current length of every connection into out (vectorized NumPy).
+    Same arguments as connection_lengths.
+    """
+    edges = slice(conn_offsets[0], conn_offsets[-1])
+    edge_conn = np.repeat(np.arange(len(out)), np.diff(conn_offsets)) # connection of each segment
+    diff = N[edge_i[edges]] - N[edge_j[edges]]
+    out[:] = np.bincount(edge_conn, weights=np.sqrt(np.einsum("ij,ij->i", diff, diff)), minlength=len(out))
+
+
+def connection_lengths(N, edge_i, edge_j, conn_offsets):
+    """
+    Computes the current length of connections, the sum of the lengths of their segments.
+    Uses the compiled kernel when numba is installed, otherwise the NumPy implementation.
+
+    Args:
+        N (np.ndarray): The (n_nodes, dim) node positions.
+        edge_i (np.ndarray): The first node index of each segment.
+        edge_j (np.ndarray): The second node index of each segment.
+        conn_offsets (np.ndarray): The segments of connection c are edge_i/edge_j[conn_offsets[c]:conn_offsets[c+1]],
+                                   a slice conn_offsets[c:c+2] gives the length of connection c alone.
+
+    Returns:
+        np.ndarray: The length of each connection (len(conn_offsets) - 1 values).
+    """
+    out = np.empty(len(conn_offsets) - 1, dtype=N.dtype)
+    if HAS_NUMBA:
+        _connection_lengths(N, edge_i, edge_j, conn_offsets, out)
+    else:
+        _connection_lengths_numpy(N, edge_i, edge_j, conn_offsets, out)
+    return out
+
+
+def spring_energies(length, stiffness, L0, is_string):
+    """
+    Computes the energy stored in spring connections, 1/2 k (l - l0)^2.
+    String connections cannot store energy when compressed.
+
+    Args:
+        length (np.ndarray): The current length of each connection.
+        stiffness (np.ndarray): The stiffness of each connection.
+        L0 (np.ndarray): The rest length of each connection.
+        is_string (np.ndarray): Whether each connection is a string.
+
+    Returns:
+        np.ndarray: The energy stored in each connection.
+    """
+    return np.where(is_string & (length < L0), 0.0, 0.5*stiffness*(length - L0)**2)
+
+
+@njit(parallel=True, cache=True, fastmath=True)
+def _total_energy(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string):
+    """
+    Computes the energy stored in all connections, the connections run in parallel.
+    Same arguments as total_energy.
+    """
+    energy = 0.0
+    for c in prange(len(stiffness)):
+        length = 0.0
+        for e in range(conn_offsets[c], conn_offsets[c+1]):
+            sq = 0.0
+            for k in range(N.shape[1]):
+                d = N[edge_i[e], k] - N[edge_j[e], k]
+                sq += d*d
+            length += np.sqrt(sq)
+
+        stretch = length - L0[c]
+        if not (is_string[c] and stretch < 0): # string connections cannot store energy when compressed
+            energy += 0.5*stiffness[c]*stretch*stretch
+    return energy
+
+
+def total_energy(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string):
+    """
+    Computes the potential energy stored in all spring connections.
+    Uses the compiled kernel when numba is installed, otherwise the NumPy implementation.
+
+    Args:
+        N (np.ndarray): The (n_nodes, dim) node positions.
+        edge_i (np.ndarray): The first node index of each segment.
+        edge_j (np.ndarray): The second node index of each segment.
+        conn_offsets (np.ndarray): The segments of connection c are edge_i/edge_j[conn_offsets[c]:conn_offsets[c+1]].
+        stiffness (np.ndarray): The stiffness of each connection.
+        L0 (np.ndarray): The rest length of each connection.
+        is_string (np.ndarray): Whether each connection is a string.
+
+    Returns:
+        float: The total energy.
+    """
+    if HAS_NUMBA:
+        return float(_total_energy(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string))
+    return float(spring_energies(connection_lengths(N, edge_i, edge_j, conn_offsets), stiffness, L0, is_string).sum())
+
+
+def assemble_virtual_work(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string, out):
+    """
+    Adds the virtual work from the spring potential energy of all connections to out.
+    Uses the compiled kernel when numba is installed, otherwise the NumPy implementation.
+
+    Args:
+        N (np.ndarray): The (n_nodes, dim) node positions.
+        edge_i (np.ndarray): The first node index of each segment.
+        edge_j (np.ndarray): The second node index of each segment.
+        conn_offsets (np.ndarray): The segments of connection c are edge_i/edge_j[conn_offsets[c]:conn_offsets[c+1]].
+        stiffness (np.ndarray): The stiffness of each connection.
+        L0 (np.ndarray): The rest length of each connection.
+        is_string (np.ndarray): Whether each connection is a string.
+        out (np.ndarray): The flat (n_nodes*dim) virtual work array that is added to.
+    """
+    if HAS_NUMBA:
+        # get_num_threads is called here because numba cannot cache kernels that call it
+        n_blocks = max(1, min(get_num_threads(), (len(stiffness) + BLOCK_SIZE - 1) // BLOCK_SIZE))
+        kernel = _assemble_3d if N.shape[1] == 3 else _assemble_2d
+        kernel(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string, out, n_blocks)
+    else:
+        _assemble_virtual_work_numpy(N, edge_i, edge_j, conn_offsets, stiffness, L0, is_string, out)
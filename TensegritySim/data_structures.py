@@ -1,5 +1,8 @@
+import copy
+import math
+import weakref
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Set, FrozenSet
 from enum import Enum
 
 class Node:
@@ -9,6 +12,7 @@ class Node:
     Attributes:
         name (str): The name of the node.
         position (numpy.ndarray): The position of the node in 2D or 3D space as a numpy array.
+                                  Once the node is part of a Tensegrity this is a view into Tensegrity.positions.
     """
 
     def __init__(self, name: str, position: list):
@@ -21,13 +25,39 @@ class Node:
             raise ValueError("Position input must contain exactly 2 or 3 numbers.")
 
         self.name = name
-        self.position = np.array(position, dtype=float)
+        self._owner = None # Weak reference to the Tensegrity that stores the position, set when the node is added to one
+        self._row = None # Row of the node in the owner's positions array
+        self._position = np.array(position, dtype=float) # Becomes a view into the owner's positions array
+
+    @property
+    def position(self) -> np.ndarray:
+        return self._position
+
+    @position.setter
+    def position(self, position):
+        if self._owner is None:
+            self._position = np.array(position, dtype=float)
+        else:
+            self._position[:] = position # write back into the owner's positions array
+
+    def _attach(self, owner, row: int) -> None:
+        """
+        Moves the position of the node into row of the positions array of owner.
+
+        Args:
+            owner (Tensegrity): The tensegrity that stores the position.
+            row (int): The row of the node in owner.positions.
+        """
+        self._owner = weakref.ref(owner) # a weak reference so the nodes don't keep the tensegrity alive
+        self._row = row
+        self._position = owner.positions[row]
 
     def __str__(self):
         return f"Node: {self.name}  Position: {self.position}"
 
     def copy(self):
-        return Node(self.name, self.position)
+        # The copy stores its own position, it is not a view into the positions array
+        return Node(self.name, self.position.copy())
 
 class Connection:
     """
@@ -55,7 +85,6 @@ class Connection:
             name (str, optional): The name of the connection. Defaults to None.
         """
         self.nodes = nodes
-        self.nodes_original = [node.copy() for node in nodes]
 
         # connection_type must be a ConnectionType enum
         if not isinstance(connection_type, Connection.ConnectionType):
@@ -69,12 +98,23 @@ class Connection:
         self.force = None
         self.name = name
 
-    def current_length(self, linked_nodes: List[Tuple[Node, Node]] = None):
+    @property
+    def nodes_original(self) -> List[Node]:
+        """
+        Copies of the nodes of the connection at their original positions (when the Tensegrity was created).
+        """
+        nodes_original = []
+        for node in self.nodes:
+            owner = node._owner() if node._owner else None
+            nodes_original.append(Node(node.name, owner.original_positions[node._row] if owner else node.position))
+        return nodes_original
+
+    def current_length(self, linked_nodes: Set[FrozenSet[str]] = None):
         """
         Calculates the current length of the connection, considering linked nodes if provided.
 
         Args:
-            linked_nodes (List[Tuple[Node, Node]], optional): A list of tuples representing linked nodes. Defaults to None.
+            linked_nodes (Set[FrozenSet[str]], optional): The pairs of linked node names (see Surface.linked_pairs). Defaults to None.
 
         Returns:
             float: The current length of the connection.
@@ -85,9 +125,10 @@ class Connection:
         length = 0
         for i in range(len(self.nodes) - 1):
             node1, node2 = self.nodes[i], self.nodes[i + 1]
-            if {node1.name, node2.name} in linked_nodes:
+            if frozenset((node1.name, node2.name)) in linked_nodes:
                 continue  # Skip linked nodes
-            length += np.linalg.norm(node1.position - node2.position)
+            d = node1.position - node2.position
+            length += math.sqrt(d @ d)
         return length
 
     def update_force(self, current_length: float):
@@ -111,16 +152,32 @@ class Surface:
     Attributes:
         shape (dict): The shape of the surface. Contains 'surface_type' and 'properties'.
         linked_nodes (List[Tuple[Node, Node]]): A list of tuples representing the linked nodes that form the seam on the surface.
+        linked_pairs (Set[FrozenSet[str]]): The names of each pair of linked nodes, for constant time membership tests.
+        surface_type (SurfaceType): The type of the surface, parsed from shape["surface_type"] (OTHER if it is not a known type).
+        radius (float): The radius of a cylinder surface, 0 for other surfaces.
     """
 
+    SurfaceType = Enum("SurfaceType", "CYLINDER OTHER")
+
     def __init__(self, shape: Dict, linked_nodes: List[Tuple[Node, Node]]):
         """
         Args:
             shape (Dict): The shape of the surface. Contains 'surface_type' and 'properties'.
             linked_nodes (List[Tuple[Node, Node]]): A list of tuples representing the linked nodes that form the seam on the surface.
+
+        Raises:
+            ValueError: If the surface is a cylinder without a radius.
         """
         self.shape = shape
         self.linked_nodes = linked_nodes
+        self.linked_pairs = {frozenset(pair) for pair in linked_nodes}
+
+        # The shape is parsed once so the solver and visualization don't look it up by key on every call
+        self.surface_type = Surface.SurfaceType.CYLINDER if shape["surface_type"] == "cylinder" else Surface.SurfaceType.OTHER
+        properties = shape.get("properties") or {}
+        if self.surface_type is Surface.SurfaceType.CYLINDER and "radius" not in properties:
+            raise ValueError("A cylinder surface must have a radius.")
+        self.radius = float(properties.get("radius", 0.0))
 
 
 class Tensegrity:
@@ -131,9 +188,15 @@ class Tensegrity:
         nodes (List[Node]): A list of nodes in the tensegrity structure.
         connections (List[Connection]): A list of connections between the nodes.
         pins (Dict[str, List[bool]], optional): A dictionary representing the pinned nodes. Defaults to an empty dictionary.
+        pins_set (FrozenSet[str]): The names of the pinned nodes.
         controls (List[Connection], optional): A list of control connections. Defaults to an empty list.
         surface (Surface, optional): The surface on which the tensegrity structure is placed. Defaults to None.
         dim (int, optional): The dimension of the tensegrity structure. Should be 2, 2.5, or 3. Defaults to None (will automatically be set).
+        positions (numpy.ndarray): The positions of all nodes as one (n_nodes, 2 or 3) array, in the order of nodes.
+                                   Assigning to it writes into the array, so the nodes stay attached.
+        original_positions (numpy.ndarray): A copy of positions from when the tensegrity structure was created.
+        node_indices (Dict[str, int]): The row of each node (by name) in positions.
+        forces_version (int): Incremented every time update_forces is called.
     """
 
     def __init__(self, nodes: List[Node], connections: List[Connection], pins: Dict[str, List[bool]] = None, controls: List[Connection] = None, surface: Surface = None, dim: int = None):
@@ -153,12 +216,22 @@ class Tensegrity:
 
         self.nodes = nodes
         self.connections = connections
+
+        # The positions of all nodes are stored in one contiguous array, each node reads and writes its own row
+        self._positions = np.array([node.position for node in nodes], dtype=float)
+        self.original_positions = self._positions.copy()
+        self.node_indices = {node.name: i for i, node in enumerate(nodes)}
+        for i, node in enumerate(nodes):
+            node._attach(self, i)
+
         self.pins = pins
+        self.pins_set = frozenset(pins) # names of the pinned nodes, for constant time membership tests
         self.controls = controls
         self.surface = surface
 
         self.control_starting_lengths = [control.initial_length for control in self.controls]
 
+        self.forces_version = 0 # incremented every time the forces are updated, so anything derived from them knows to recompute
         self.update_forces()
 
         if dim is None:
@@ -170,14 +243,33 @@ class Tensegrity:
                 dim = 3
         self.dim = dim
 
+    @property
+    def positions(self) -> np.ndarray:
+        return self._positions
+
+    @positions.setter
+    def positions(self, positions):
+        self._positions[...] = positions # written in place, the nodes hold views into this array
+
+    def __deepcopy__(self, memo):
+        copied = self.__class__.__new__(self.__class__)
+        memo[id(self)] = copied
+        for key, value in self.__dict__.items():
+            setattr(copied, key, copy.deepcopy(value, memo))
+        # The copied nodes hold copies of the views, move them back into the copied positions array
+        for i, node in enumerate(copied.nodes):
+            node._attach(copied, i)
+        return copied
+
     def update_forces(self):
         """
         Updates the forces in all connections.
         Call after updating the positions of the nodes.
         """
         for connection in self.connections:
-            current_length = connection.current_length(self.surface.linked_nodes if self.surface else None)
+            current_length = connection.current_length(self.surface.linked_pairs if self.surface else None)
             connection.update_force(current_length)
+        self.forces_version += 1
 
     def get_control_order(self):
         """
@@ -1,8 +1,11 @@
+import math
 import numpy as np
-from typing import Dict
+from typing import Dict, List, Union
+from scipy import sparse
 from scipy.optimize import root
 
-from .data_structures import Connection, Tensegrity
+from .data_structures import Connection, Surface, Tensegrity
+from ._kernels import assemble_virtual_work, connection_lengths, spring_energies, total_energy
 
 
 class TensegritySolver:
@@ -16,13 +19,20 @@ class TensegritySolver:
         tensegrity (Tensegrity): The tensegrity object containing nodes and connections.
         dim (int): The dimension of the optimization problem (defaults to tensegrity's dim).
     """
-    def __init__(self, tensegrity: Tensegrity) -> None:
+    KRYLOV_SIZE = 200 # number of generalized coordinates from which the default solve uses the Jacobian-free krylov method
+                      # (and from which _jacobian returns a sparse matrix)
+
+    def __init__(self, tensegrity: Tensegrity, seed: int = None, dtype: np.dtype = np.float64) -> None:
         """
         Initializes an Optimization object.
 
         Args:
             tensegrity (Tensegrity): The tensegrity object containing nodes and connections.
-            dim (int): The dimension of the optimization problem (default is 3).
+            seed (int, optional): Seed for the random perturbation used when a solve is retried. Defaults to None.
+            dtype (np.dtype, optional): The floating point type the virtual work is assembled in. Defaults to np.float64.
+                                        np.float32 halves the memory traffic of the assembly, but the virtual work is then
+                                        only accurate to about 1e-7 relative to the connection forces, so the solver
+                                        tolerances must not be tighter than that.
 
         Raises:
             ValueError: If connection stiffness is less than 0.
@@ -33,9 +43,108 @@ class TensegritySolver:
         if self.dim == 2.5:
             self.dim = 2
 
-        self.node_indices = {node.name: i for i, node in enumerate(self.tensegrity.nodes)}
+        self.node_indices = self.tensegrity.node_indices
+
+        self._rng = np.random.default_rng(seed)
+
+        self.dtype = np.dtype(dtype)
 
-        self.forces = np.zeros(self.dim*len(self.tensegrity.nodes))
+        self._ndof = self.dim*len(self.tensegrity.nodes) # number of coordinates of all nodes
+        # scratch buffers reused by every objective call, the assembly writes to _assembly_buf (in dtype)
+        self._virtual_work_buf = np.empty(self._ndof)
+        self._assembly_buf = self._virtual_work_buf if self.dtype == np.float64 else np.empty(self._ndof, dtype=self.dtype)
+
+        self.forces = np.zeros(self._ndof)
+
+        # Mask of the degrees of freedom that are not pinned (those are the generalized coordinates)
+        self.free_mask = np.ones(self._ndof, dtype=bool)
+        for node, bools in self.tensegrity.pins.items():
+            index = self.node_indices[node]*self.dim
+            for i in range(self.dim):
+                if bools[i]:
+                    self.free_mask[index + i] = False
+
+        # Rows of the virtual work that are kept in the objective (keep_mask), and the linked coordinates
+        # whose virtual work is folded into their partner (fold_src into fold_dst) before they are dropped
+        self.keep_mask = self.free_mask.copy()
+        fold_src, fold_dst = [], []
+        if self.tensegrity.surface:
+            for node1, node2 in self.tensegrity.surface.linked_nodes:
+                for i in range(2):
+                    index1 = self.node_indices[node1]*self.dim + i
+                    index2 = self.node_indices[node2]*self.dim + i
+                    if not self.free_mask[index1]:
+                        self.keep_mask[index2] = False
+                    elif not self.free_mask[index2]:
+                        self.keep_mask[index1] = False
+                    else:
+                        # x: Because the x-coords of linked nodes must be exactly the circumference of the cylinder apart
+                        # (N1[0] = N2[0] +/- C), the relationship is linear
+                        # therefore dV/dq_i = dV/dq_j for the x-coord of linked nodes i and j,
+                        # so we can add the virtual work of node2 in the x to node1 in the x
+                        # so it was as if we always had taken the derivative with respect to node1x where node2x is a function of node1x
+                        # y: The y-coords of linked nodes must be the same, so we can add the virtual work of node2 in the y to node1 in the y
+                        fold_dst.append(index1)
+                        fold_src.append(index2)
+                        self.keep_mask[index2] = False
+
+        # A coordinate can be the destination of one fold and the source of another (chained linked pairs),
+        # each source is folded straight into the end of its chain so the order of the folds does not matter
+        if len(set(fold_src)) != len(fold_src):
+            raise ValueError("A node can only be the second node of one linked pair.")
+        fold_map = dict(zip(fold_src, fold_dst))
+        for n, dst in enumerate(fold_dst):
+            chain = {fold_src[n]}
+            while dst in fold_map:
+                if dst in chain:
+                    raise ValueError("Linked node pairs must not form a cycle.")
+                chain.add(dst)
+                dst = fold_map[dst]
+            fold_dst[n] = dst
+
+        self.fold_src = np.array(fold_src, dtype=int)
+        self.fold_dst = np.array(fold_dst, dtype=int)
+
+        # Row of the objective each entry of the virtual work ends up in after the folds, and column of each
+        # coordinate among the generalized coordinates (-1 for dropped rows and pinned coordinates), for the Jacobian
+        kept_rows = np.cumsum(self.keep_mask) - 1
+        kept_rows[~self.keep_mask] = -1
+        self._jacobian_rows = kept_rows.copy()
+        self._jacobian_rows[self.fold_src] = kept_rows[self.fold_dst]
+        self._jacobian_cols = np.cumsum(self.free_mask) - 1
+        self._jacobian_cols[~self.free_mask] = -1
+
+        # Node indices of each linked pair, for the surface constraints
+        linked_nodes = self.tensegrity.surface.linked_nodes if self.tensegrity.surface else []
+        self.link_i = np.array([self.node_indices[node1] for node1, _ in linked_nodes], dtype=int)
+        self.link_j = np.array([self.node_indices[node2] for _, node2 in linked_nodes], dtype=int)
+
+        # Size of the objective: the kept virtual work followed by the surface constraints
+        self._n_virtual_work = np.count_nonzero(self.keep_mask)
+        n_constraints = 2*len(self.link_i) if self.tensegrity.surface and self.tensegrity.surface.surface_type is Surface.SurfaceType.CYLINDER else 0
+        self._n_objective = self._n_virtual_work + n_constraints
+
+        # Table of the segments of all connections (CSR style: the segments of connection c are
+        # edge_i/edge_j[conn_offsets[c]:conn_offsets[c+1]]) so the objective never looks up nodes by name
+        edge_i, edge_j, conn_offsets = [], [], [0]
+        for connection in self.tensegrity.connections:
+            for i in range(len(connection.nodes) - 1):
+                node1, node2 = connection.nodes[i].name, connection.nodes[i+1].name
+                if self.tensegrity.surface and frozenset((node1, node2)) in self.tensegrity.surface.linked_pairs:
+                    continue # linked nodes add no length to the connection
+                edge_i.append(self.node_indices[node1])
+                edge_j.append(self.node_indices[node2])
+            conn_offsets.append(len(edge_i))
+
+        self.connection_indices = {connection: c for c, connection in enumerate(self.tensegrity.connections)}
+        self.edge_i = np.array(edge_i, dtype=np.int32)
+        self.edge_j = np.array(edge_j, dtype=np.int32)
+        self.conn_offsets = np.array(conn_offsets, dtype=np.int32)
+
+        self.stiffness = np.zeros(len(self.tensegrity.connections), dtype=self.dtype)
+        self.is_string = np.array([connection.connection_type is Connection.ConnectionType.STRING for connection in self.tensegrity.connections], dtype=bool)
+        self.rest_length = np.zeros(len(self.tensegrity.connections), dtype=self.dtype)
+        self._update_parameters()
 
     def set_forces(self, forces: Dict[str, np.ndarray]) -> None:
         """
@@ -47,7 +156,7 @@ class TensegritySolver:
         Raises:
             ValueError: If the force vector does not have the same dimension as the optimization problem.
         """
-        self.forces = np.zeros(self.dim*len(self.tensegrity.nodes))
+        self.forces = np.zeros(self._ndof)
 
         for node, force in forces.items():
             if len(force) != self.dim:
@@ -56,7 +165,7 @@ class TensegritySolver:
             index = self.node_indices[node]
             self.forces[index*self.dim : index*self.dim + self.dim] = force
 
-    def solve(self, method: str = "lm") -> None:
+    def solve(self, method: str = None) -> None:
         """
         Solves the position of nodes in the tensegrity structure.
         
@@ -64,38 +173,81 @@ class TensegritySolver:
         in the tensegrity structure with Virtual Work.
         
         Args:
-            method (str): The method to use for the root function (default is "lm").
+            method (str, optional): The method to use for the root function. Defaults to None, which uses "hybr"
+                                    (with the analytic Jacobian) for small problems and the Jacobian-free "krylov"
+                                    for large ones, falling back to "lm" if that fails. Those methods need a square
+                                    system, so "lm" is used alone when the objective has more equations than unknowns
+                                    (e.g. when both nodes of a linked pair are pinned).
         
         Returns:
             None. Changes are made internally to the Tensegrity object.
         """
+        self._update_parameters() # control lengths may have changed since the last solve
+
         x0 = self._create_initial_guess() # The current positions of the nodes (excluding pinned nodes)
 
-        result = root(self._objective, x0, method=method) # solver
+        if method is None and self._n_objective != len(x0):
+            methods = ["lm"] # least squares, the only method that accepts a non-square system
+        elif method is None:
+            methods = ["hybr" if len(x0) < self.KRYLOV_SIZE else "krylov", "lm"]
+        else:
+            methods = [method]
+
+        result = self._root(x0, methods) # solver
 
         if not result.success:
             print(result)
             print("Optimization failed.")
             print("Retrying with perturbed initial guess.")
 
-            x0 = x0 + np.random.normal(0, 0.1, len(x0))
-            result = root(self._objective, x0, method=method)
+            x0 = x0 + 0.1 * self._rng.standard_normal(x0.size)
+            result = self._root(x0, methods)
 
             if not result.success:
                 print(result)
                 print("Optimization failed again.")
                 return
 
-        N = self._get_nodes_from_input(result.x)
-
         # update the positions of the nodes
-        for i, node in enumerate(self.tensegrity.nodes):
-            node.position = N[i]
+        self.tensegrity.positions[:, :self.dim] = self._get_nodes_from_input(result.x)
 
         self.tensegrity.update_forces()
 
 
     # --------------------- INTERNAL FUNCTIONS ---------------------
+    def _root(self, x0: np.ndarray, methods: List[str]):
+        """
+        Finds the root of the objective function, trying each method in turn until one succeeds.
+
+        Args:
+            x0 (np.ndarray): The initial guess.
+            methods (List[str]): The methods to use for the root function, in order.
+
+        Returns:
+            OptimizeResult: The result of the last method tried.
+        """
+        # hybr and lm only take a dense Jacobian, for large problems their own finite differences are cheaper than densifying it
+        use_jacobian = len(x0) < self.KRYLOV_SIZE
+        for method in methods:
+            jac = self._jacobian if use_jacobian and method in ("hybr", "lm") else None # the other methods do not use a Jacobian
+            result = root(self._objective, x0, jac=jac, method=method)
+            if result.success:
+                break
+
+        return result
+
+    def _update_parameters(self) -> None:
+        """
+        Copies the values that can change between solves (the initial length and stiffness of every connection
+        and the positions of the pinned coordinates) into the arrays used by the objective.
+        """
+        for c, connection in enumerate(self.tensegrity.connections):
+            self.rest_length[c] = connection.initial_length
+            self.stiffness[c] = connection.stiffness
+
+        # The pinned coordinates of the node buffer stay fixed during a solve, only the free ones are overwritten
+        self._nodes_buf = self.tensegrity.positions[:, :self.dim].flatten()
+
     def _objective(self, x: np.ndarray) -> np.ndarray:
         """
         Computes the objective function for the optimization problem.
@@ -110,150 +262,145 @@ class TensegritySolver:
         """
         N = self._get_nodes_from_input(x)
 
-        virtual_work = np.zeros(self.dim*len(self.tensegrity.nodes))
-
-        # Virtual work from potential energy
-        for connection in self.tensegrity.connections:
-            virtual_work += self._spring_connection_energy_derivative(connection, N)
+        # Virtual work from potential energy, all connections at once
+        # For each connection V = 0.5 * k * (l - l0)^2, so -dV/dq_i = -k * (l - l0) * dl/dq_i = C * dl/dq_i
+        self._assembly_buf.fill(0.0)
+        assemble_virtual_work(N.astype(self.dtype, copy=False), self.edge_i, self.edge_j, self.conn_offsets, self.stiffness, self.rest_length, self.is_string, self._assembly_buf)
 
-        # Virtual work from external forces
-        virtual_work += self.forces
+        # Virtual work from external forces (this also brings the virtual work back to float64)
+        virtual_work = np.add(self._assembly_buf, self.forces, out=self._virtual_work_buf)
 
-        # delete the pinned nodes (those cannot be generalized coordinates)
-        delete_indices = set()
-        for node, bools in self.tensegrity.pins.items():
-            for i in range(self.dim):
-                if bools[i]:
-                    delete_indices.add(self.node_indices[node]*self.dim + i)
+        # Write both parts straight into the output (a new array each call, the solver may keep previous results)
+        objective = np.empty(self._n_objective)
+        self._reduce_virtual_work(virtual_work, out=objective[:self._n_virtual_work])
 
         if self.tensegrity.surface:
-            for node1, node2 in self.tensegrity.surface.linked_nodes:
-                if self.node_indices[node1]*self.dim in delete_indices:
-                    delete_indices.add(self.node_indices[node2]*self.dim)
-                elif self.node_indices[node2]*self.dim in delete_indices:
-                    delete_indices.add(self.node_indices[node1]*self.dim)
-                else:
-                    # Because the x-coords of linked nodes must be exactly the circumference of the cylinder apart
-                    # (N1[0] = N2[0] +/- C), the relationship is linear
-                    # therefore dV/dq_i = dV/dq_j for the x-coord of linked nodes i and j,
-                    # so we can add the virtual work of node2 in the x to node1 in the x
-                    # so it was as if we always had taken the derivative with respect to node1x where node2x is a function of node1x
-                    virtual_work[self.node_indices[node1]*self.dim] += virtual_work[self.node_indices[node2]*self.dim]
-                    delete_indices.add(self.node_indices[node2]*self.dim)
-
-                if self.node_indices[node1]*self.dim + 1 in delete_indices:
-                    delete_indices.add(self.node_indices[node2]*self.dim + 1)
-                elif self.node_indices[node2]*self.dim + 1 in delete_indices:
-                    delete_indices.add(self.node_indices[node1]*self.dim + 1)
-                else:
-                    # The y-coords of linked nodes must be the same, so we can add the virtual work of node2 in the y to node1 in the y
-                    virtual_work[self.node_indices[node1]*self.dim + 1] += virtual_work[self.node_indices[node2]*self.dim + 1]
-                    delete_indices.add(self.node_indices[node2]*self.dim + 1)
-
-            virtual_work = np.delete(virtual_work, list(delete_indices))
-
-            objective = np.append(virtual_work, self._surface_constraints(x))
-
-        else:
-            objective = np.delete(virtual_work, list(delete_indices))
+            self._surface_constraints(N, out=objective[self._n_virtual_work:])
 
         return objective
 
-    def _spring_connection_energy(self, connection: Connection, N: np.ndarray) -> float:
+    def _jacobian(self, x: np.ndarray) -> Union[np.ndarray, sparse.csr_matrix]:
         """
-        Calculates the energy stored in a spring connection.
+        Computes the analytic Jacobian of the objective function with respect to the generalized coordinates.
+
+        The virtual work is -dV/dq + F, so its derivative is the negative Hessian of the spring energy.
+        For a connection with V = 0.5 * k * (l - l0)^2:
+            d2V/dq2 = k * dl/dq dl/dq^T + k * (l - l0) * d2l/dq2
+        where each segment of length l_s and direction u contributes (I - u u^T) / l_s to d2l/dq2
+        in the blocks [[P, -P], [-P, P]] of its two nodes.
+        Each connection only couples its own nodes, so the blocks are assembled into a sparse matrix.
 
         Args:
-            connection (Connection): The spring connection object.
-            N (np.ndarray): The current positions of all nodes.
+            x (np.ndarray): Input array representing the generalized coordinates.
 
         Returns:
-            float: The energy stored in the spring connection.
+            np.ndarray or sparse.csr_matrix: The Jacobian matrix, with a row per objective entry and a column per generalized coordinate.
+                                             Dense below KRYLOV_SIZE generalized coordinates, sparse from there on.
         """
-        # current length
-        length = self._connection_length(connection, N)
-
-        if connection.connection_type.name == Connection.ConnectionType.STRING.name and length < connection.initial_length:  # string connections cannot store energy when compressed
-            return 0
+        N = self._get_nodes_from_input(x)
+        n_connections = len(self.stiffness)
+
+        edge_conn = np.repeat(np.arange(n_connections), np.diff(self.conn_offsets)) # connection of each segment
+        diff = N[self.edge_i] - N[self.edge_j]
+        seg_length = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+        length = np.bincount(edge_conn, weights=seg_length, minlength=n_connections)
+
+        # Only the segments of active connections contribute: string connections cannot store energy when compressed
+        active = ~(self.is_string & (length < self.rest_length))
+        active_edges = active[edge_conn] & (seg_length > 0)
+        edge_conn, edge_i, edge_j = edge_conn[active_edges], self.edge_i[active_edges], self.edge_j[active_edges]
+        seg_length = seg_length[active_edges]
+        u = diff[active_edges] / seg_length[:, None]
+
+        # k * dl/dq dl/dq^T: dl/dq is u at the first node of each segment and -u at the second,
+        # so there is a block for every pair of segment ends of the same connection
+        end_conn = np.repeat(edge_conn, 2) # sorted, the segments are stored by connection
+        end_node = np.stack((edge_i, edge_j), axis=1).ravel()
+        end_dl = np.stack((u, -u), axis=1).reshape(-1, self.dim)
+        n_ends = np.bincount(end_conn, minlength=n_connections)[end_conn] # number of ends of the connection of each end
+        a = np.repeat(np.arange(len(end_conn)), n_ends)
+        b = np.searchsorted(end_conn, end_conn[a]) + np.arange(len(a)) - np.repeat(np.cumsum(n_ends) - n_ends, n_ends)
+        outer = self.stiffness[end_conn[a], None, None] * end_dl[a, :, None] * end_dl[b, None, :]
+
+        # k * (l - l0) * d2l/dq2
+        tension = self.stiffness[edge_conn] * (length[edge_conn] - self.rest_length[edge_conn]) / seg_length
+        P = tension[:, None, None] * (np.eye(self.dim) - u[:, :, None] * u[:, None, :])
+
+        block_i = np.concatenate((end_node[a], edge_i, edge_j, edge_i, edge_j))
+        block_j = np.concatenate((end_node[b], edge_i, edge_j, edge_j, edge_i))
+        blocks = np.concatenate((outer, P, P, -P, -P))
+
+        # Scatter the blocks of the negative Hessian, folded and reduced to the rows and columns of the objective
+        k = np.arange(self.dim)
+        rows = self._jacobian_rows[block_i[:, None, None]*self.dim + k[None, :, None]]
+        cols = self._jacobian_cols[block_j[:, None, None]*self.dim + k[None, None, :]]
+        rows, cols = np.broadcast_arrays(rows, cols)
+        kept = (rows >= 0) & (cols >= 0)
+        jacobian = sparse.coo_matrix((-blocks[kept], (rows[kept], cols[kept])), shape=(self._n_virtual_work, len(x))).tocsr()
 
-        # energy
-        energy = 0.5 * connection.stiffness * (length - connection.initial_length)**2
+        if self.tensegrity.surface:
+            jacobian = sparse.vstack((jacobian, self._surface_constraints_jacobian(N)), format="csr")
 
-        return energy
+        return jacobian.toarray() if len(x) < self.KRYLOV_SIZE else jacobian
 
-    def _spring_connection_energy_derivative(self, connection: Connection, N: np.ndarray) -> np.ndarray:
+    def _reduce_virtual_work(self, virtual_work: np.ndarray, out: np.ndarray = None) -> np.ndarray:
         """
-        Calculates the derivative of the spring connection energy with respect to node positions.
-
-        The energy of a spring connection is given by:
-            V = 0.5 * k * (l - l0)^2
-        where k is the stiffness, l is the current length of the connection, and l0 is the rest length.
-
-        The derivative of the energy with respect to the position of node i is:
-            dV/dq_i = -k * (l - l0) * dl/dq_i
-                    = C * dl/dq_i
-        where C is a constant factor.
+        Removes the entries (rows) of the virtual work that are not generalized coordinates:
+        the pinned nodes, and the second node of each linked pair whose virtual work is added to the first.
 
         Args:
-            connection (Connection): The connection object representing the spring.
-            N (np.ndarray): The array of node positions.
+            virtual_work (np.ndarray): The virtual work, or a matrix with a row per entry of the virtual work. Modified in place.
+            out (np.ndarray, optional): Array the result is written to. Defaults to None (a new array is allocated).
 
         Returns:
-            np.ndarray: The derivative of the spring connection energy with respect to the node positions.
+            np.ndarray: The reduced virtual work (or matrix).
         """
-        # current length
-        length = self._connection_length(connection, N)
+        np.add.at(virtual_work, self.fold_dst, virtual_work[self.fold_src])
 
-        if connection.connection_type.name == Connection.ConnectionType.STRING.name and length < connection.initial_length: # string connections cannot store energy when compressed
-            return np.zeros(self.dim*len(self.tensegrity.nodes))
+        return np.compress(self.keep_mask, virtual_work, axis=0, out=out)
 
-        C = -connection.stiffness * (length - connection.initial_length)
-
-        return C * self._length_derivative(connection, N)
-
-    def _length_derivative(self, connection: Connection, N: np.ndarray) -> np.ndarray:
+    def _total_energy(self, N: np.ndarray) -> float:
         """
-        Calculates the derivative of the length of a connection with respect to the node positions.
-        
+        Calculates the potential energy stored in all spring connections, the negative of its gradient is the virtual work from springs.
+        Uses the rest lengths and stiffnesses from the last solve (or from when the solver was created).
+
         Args:
-            connection (Connection): The connection object containing the nodes.
-            N (np.ndarray): The array of node positions.
-        
+            N (np.ndarray): The current positions of all nodes.
+
         Returns:
-            np.ndarray: The derivative of the length with respect to the node positions.
+            float: The total energy stored in the spring connections.
         """
-        # l = sum_i=1^n-1 ||N_i - N_i+1||
+        return total_energy(N.astype(self.dtype, copy=False), self.edge_i, self.edge_j, self.conn_offsets, self.stiffness, self.rest_length, self.is_string)
 
-        dl = np.zeros(self.dim*len(self.tensegrity.nodes))
+    def _spring_connection_energy(self, connection: Connection, N: np.ndarray) -> float:
+        """
+        Calculates the energy stored in a spring connection.
 
-        for i in range(len(connection.nodes) - 1):
-            N1_index = self.node_indices[connection.nodes[i].name]
-            N2_index = self.node_indices[connection.nodes[i+1].name]
-            N1 = N[N1_index]
-            N2 = N[N2_index]
-            length = self._node_distance(connection.nodes[i].name, connection.nodes[i+1].name, N)
-            if length == 0:
-                continue
-            dl[N1_index*self.dim : N1_index*self.dim + self.dim] += (N1 - N2) / length
-            dl[N2_index*self.dim : N2_index*self.dim + self.dim] += (N2 - N1) / length
+        Args:
+            connection (Connection): The spring connection object (one of the connections of the tensegrity).
+            N (np.ndarray): The current positions of all nodes.
+
+        Returns:
+            float: The energy stored in the spring connection.
+        """
+        length = self._connection_length(connection, N)
+        is_string = connection.connection_type is Connection.ConnectionType.STRING
 
-        return dl
+        return float(spring_energies(length, connection.stiffness, connection.initial_length, is_string))
 
     def _connection_length(self, connection: Connection, N: np.ndarray) -> float:
         """
         Calculates the current length of a connection based on the node positions.
 
         Args:
-            connection (Connection): The connection object.
+            connection (Connection): The connection object (one of the connections of the tensegrity).
             N (np.ndarray): The current positions of all nodes.
 
         Returns:
             float: The current length of the connection.
         """
-        length = 0
-        for i in range(len(connection.nodes) - 1):
-            length += self._node_distance(connection.nodes[i].name, connection.nodes[i+1].name, N)
-        return length
+        c = self.connection_indices[connection]
+        return float(connection_lengths(N, self.edge_i, self.edge_j, self.conn_offsets[c:c+2])[0])
 
     def _node_distance(self, node1: str, node2: str, N: np.ndarray) -> float:
         """
@@ -271,17 +418,19 @@ class TensegritySolver:
         N2 = N[self.node_indices[node2]]
 
         if self.tensegrity.surface:
-            if {node1, node2} in self.tensegrity.surface.linked_nodes:
+            if frozenset((node1, node2)) in self.tensegrity.surface.linked_pairs:
                 return 0
 
-        return np.linalg.norm(N1 - N2)
+        d = N1 - N2
+        return math.sqrt(d @ d)
 
-    def _surface_constraints(self, x: np.ndarray) -> np.ndarray:
+    def _surface_constraints(self, N: np.ndarray, out: np.ndarray = None) -> np.ndarray:
         """
         Computes the surface constraints for the optimization problem.
 
         Args:
-            x (np.ndarray): The input array representing the current state of the nodes.
+            N (np.ndarray): The current positions of all nodes.
+            out (np.ndarray, optional): Array the constraints are written to. Defaults to None (a new array is allocated).
 
         Returns:
             np.ndarray: An array of constraints that must be satisfied. For a cylindrical surface, 
@@ -289,18 +438,44 @@ class TensegritySolver:
                         - The y-coordinates of linked nodes are equal.
                         - The x-coordinates of linked nodes are exactly the circumference of the cylinder apart.
         """
-        N = self._get_nodes_from_input(x)
+        if self.tensegrity.surface.surface_type is not Surface.SurfaceType.CYLINDER:
+            return np.empty(0) if out is None else out
 
-        constraints = []
-        if self.tensegrity.surface.shape["surface_type"] == "cylinder":
-            r = self.tensegrity.surface.shape["properties"]["radius"]
-            for node1, node2 in self.tensegrity.surface.linked_nodes:
-                N1 = N[self.node_indices[node1]]
-                N2 = N[self.node_indices[node2]]
-                constraints.append(N1[1] - N2[1]) # y values must be the same
-                constraints.append(np.abs(N1[0] - N2[0]) - 2*np.pi*r) # x values must be exactly the circumference of the cylinder apart
+        if out is None:
+            out = np.empty(2*len(self.link_i))
+
+        r = self.tensegrity.surface.radius
+        out[0::2] = N[self.link_i, 1] - N[self.link_j, 1] # y values must be the same
+        out[1::2] = np.abs(N[self.link_i, 0] - N[self.link_j, 0]) - 2*np.pi*r # x values must be exactly the circumference of the cylinder apart
+
+        return out
+
+    def _surface_constraints_jacobian(self, N: np.ndarray) -> sparse.csr_matrix:
+        """
+        Computes the derivative of the surface constraints with respect to the generalized coordinates.
+
+        Args:
+            N (np.ndarray): The current positions of all nodes.
 
-        return np.array(constraints)
+        Returns:
+            sparse.csr_matrix: A matrix with a row per surface constraint (in the order of _surface_constraints)
+                               and a column per generalized coordinate.
+        """
+        n_free = np.count_nonzero(self.free_mask)
+        if self.tensegrity.surface.surface_type is not Surface.SurfaceType.CYLINDER:
+            return sparse.csr_matrix((0, n_free))
+
+        rows = 2*np.arange(len(self.link_i))
+        sign = np.sign(N[self.link_i, 0] - N[self.link_j, 0])
+
+        # d(N1[1] - N2[1]) and d(|N1[0] - N2[0]| - 2*pi*r)
+        rows = np.concatenate((rows, rows, rows + 1, rows + 1))
+        cols = np.concatenate((self.link_i*self.dim + 1, self.link_j*self.dim + 1, self.link_i*self.dim, self.link_j*self.dim))
+        values = np.concatenate((np.ones(len(self.link_i)), -np.ones(len(self.link_i)), sign, -sign))
+
+        cols = self._jacobian_cols[cols] # pinned coordinates are not generalized coordinates
+        kept = cols >= 0
+        return sparse.coo_matrix((values[kept], (rows[kept], cols[kept])), shape=(2*len(self.link_i), n_free)).tocsr()
 
 
     def _create_initial_guess(self) -> np.ndarray:
@@ -311,11 +486,9 @@ class TensegritySolver:
             np.ndarray: The input vector x0. 
                         length = d*len(nodes) - pins, Elements are the node positions (except those that are pinned)
         """
-        x0 = np.array([node.position[:self.dim] for node in self.tensegrity.nodes]).flatten() # position of the nodes
-
-        x0 = np.delete(x0, [self.node_indices[node]*self.dim + i for node, bools in self.tensegrity.pins.items() for i in range(self.dim) if bools[i]])
+        x0 = self.tensegrity.positions[:, :self.dim].flatten() # position of the nodes
 
-        return x0
+        return x0[self.free_mask]
 
     def _get_nodes_from_input(self, x: np.ndarray) -> np.ndarray:
         """
@@ -326,16 +499,8 @@ class TensegritySolver:
 
         Returns:
             np.ndarray: The extracted node positions including those removed from the input because they were pinned.
+                        This is a view into a buffer that is overwritten by the next call.
         """
-        ins_index = {}
-        for node, bools in self.tensegrity.pins.items():
-            index = self.node_indices[node]*self.dim
-            for i in range(self.dim):
-                if bools[i]:
-                    ins_index[index + i] = self.tensegrity.nodes[self.node_indices[node]].position[i]
-        for index, value in ins_index.items():
-            x = np.insert(x, index, value)
-
-        x = x.reshape(-1, self.dim)
+        self._nodes_buf[self.free_mask] = x
 
-        return x
+        return self._nodes_buf.reshape(-1, self.dim)
@@ -1,13 +1,18 @@
 import matplotlib.pyplot as plt
 import numpy as np
+from typing import List
 from mpl_toolkits import mplot3d
-from .data_structures import Tensegrity, Connection
+from matplotlib.collections import LineCollection
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from .data_structures import Tensegrity, Connection, Surface
 
 class Visualization:
     """
     Visualization class for tensegrity structures.
 
     This class provides methods to visualize 2D and 3D tensegrity structures using matplotlib.
+    Plots are drawn with fig.canvas.draw_idle(), so for an interactive window call plt.ion() before creating a Visualization
+    (or plt.show() once at the end in a script).
 
     Attributes:
         tensegrity (Tensegrity): The tensegrity structure to visualize.
@@ -41,6 +46,45 @@ class Visualization:
         else:
             raise ValueError("Invalid dimension. Must be 2, 2.5, or 3.")
 
+        # The topology never changes, so the rows of the nodes of every connection in tensegrity.positions are found once
+        # and the plots gather the positions with them
+        connection_rows = [[tensegrity.node_indices[node.name] for node in connection.nodes] for connection in tensegrity.connections]
+        self._conn_rows = np.array([row for rows in connection_rows for row in rows], dtype=int) # concatenated rows of all connections
+        self._conn_splits = np.cumsum([len(rows) for rows in connection_rows])[:-1] # where _conn_rows is split into connections
+
+        # Segments are consecutive pairs of nodes in a connection
+        self._seg_start = np.array([rows[i] for rows in connection_rows for i in range(len(rows) - 1)], dtype=int)
+        self._seg_end = np.array([rows[i + 1] for rows in connection_rows for i in range(len(rows) - 1)], dtype=int)
+        self._seg_conn = np.array([c for c, rows in enumerate(connection_rows) for _ in range(len(rows) - 1)], dtype=int)
+        # Strings across the seam between linked nodes are not drawn in 2.5D
+        linked_pairs = tensegrity.surface.linked_pairs if tensegrity.surface else set()
+        self._seg_hidden = np.array([tensegrity.connections[c].connection_type == Connection.ConnectionType.STRING
+                                     and frozenset((tensegrity.nodes[i].name, tensegrity.nodes[j].name)) in linked_pairs
+                                     for i, j, c in zip(self._seg_start, self._seg_end, self._seg_conn)], dtype=bool)
+
+        # In 2.5D every segment is drawn as 100 points along the straight line between its nodes (before the transform),
+        # the interpolation parameters and the buffer the points are written to are reused by every plot
+        self._t_values = np.linspace(0, 1, 100)[None, :, None]
+        self._seg_buf = np.empty((np.count_nonzero(~self._seg_hidden), 100, 2))
+
+        # Connection labels are placed between the first two nodes of the connection
+        self._conn_first = np.array([rows[0] for rows in connection_rows], dtype=int)
+        self._conn_second = np.array([rows[1] for rows in connection_rows], dtype=int)
+
+        # Colors only depend on the connections, the line styles depend on the forces and are recomputed when they change
+        self._conn_is_string = np.array([connection.connection_type == Connection.ConnectionType.STRING for connection in tensegrity.connections], dtype=bool)
+        self._conn_colors = self._connection_colors()
+        self._conn_styles = None
+        self._styles_version = None # Tensegrity.forces_version of _conn_styles
+
+        # Artists of the last plot, update() moves them instead of plotting again
+        self._line_coll = None # all connections
+        self._pin_artist = None # pinned nodes
+        self._free_artist = None # free nodes
+        self._node_labels = [] # label of each node (when labeled)
+        self._connection_labels = [] # (connection index, label) of each labeled connection
+        self._label_forces = False
+
     def plot(self, label_nodes: bool = False, label_connections: bool = False, label_forces: bool = False):
         """
         Plots the visualization of the tensegrity structure.
@@ -70,52 +114,35 @@ class Visualization:
         self.ax.set_aspect("equal")
         self.ax.set_xlabel("X")
         self.ax.set_ylabel("Y")
-        color_index = 1 # Using "CN" color cycle
-        color_names = {}
 
         # --- Plot connections ---
-        for connection in self.tensegrity.connections:
-            # Strings are dashed lines
-            if connection.connection_type == Connection.ConnectionType.STRING:
-                # Set color
-                color = "k"
-                if connection.name or len(connection.nodes) > 2:
-                    color = f"C{color_index}"
-                    if connection.name:
-                        color_names[connection.name] = color_index
-                    color_index += 1
-
-                style = "--" if connection.force > 1e-3 else ":"
-                # Plot line
-                self.ax.plot([node.position[0] for node in connection.nodes], [node.position[1] for node in connection.nodes], f"{color}{style}")
-
-            # Bars are solid lines
-            elif connection.connection_type == Connection.ConnectionType.BAR:
-                style = "-" if np.abs(connection.force) > 1e-3 else "-."
-                self.ax.plot([connection.nodes[0].position[0], connection.nodes[1].position[0]], [connection.nodes[0].position[1], connection.nodes[1].position[1]], f"k{style}")
+        # All connections are drawn by one collection, strings are dashed lines and bars are solid lines
+        colors, styles = self._segment_styles()
+        self._line_coll = LineCollection(self._segments(), colors=colors, linestyles=styles)
+        self.ax.add_collection(self._line_coll)
+        self.ax.autoscale_view()
 
         # --- plot nodes and label ---
-        for node in self.tensegrity.nodes:
-            # TODO: How to differentiate between 1D and 2D pinning?
-            if node.name in self.tensegrity.pins:
-                self.ax.plot(node.position[0], node.position[1], "rX")
-            else:
-                self.ax.plot(node.position[0], node.position[1], "ko")
-            if label_nodes:
-                self.ax.annotate(node.name, (node.position[0], node.position[1]), (.2, .2), textcoords="offset fontsize")
-
-        if label_forces:
-            for connection in self.tensegrity.connections:
-                if connection.name:
-                    self.ax.annotate(f"{connection.name}: {connection.force:.2f}", ((connection.nodes[0].position[0] + connection.nodes[1].position[0])/2, (connection.nodes[0].position[1] + connection.nodes[1].position[1])/2), ha="center")
-                else:
-                    self.ax.annotate(f"{connection.force:.2f}", ((connection.nodes[0].position[0] + connection.nodes[1].position[0])/2, (connection.nodes[0].position[1] + connection.nodes[1].position[1])/2), ha="center")
-        elif label_connections:
-            for connection in self.tensegrity.connections:
-                if connection.name:
-                    self.ax.annotate(connection.name, ((connection.nodes[0].position[0] + connection.nodes[1].position[0])/2, (connection.nodes[0].position[1] + connection.nodes[1].position[1])/2), ha="center")
-
-        self.fig.show()
+        # TODO: How to differentiate between 1D and 2D pinning?
+        positions = self._node_positions()
+        pinned = self._pinned_mask()
+        self._pin_artist, = self.ax.plot(positions[pinned, 0], positions[pinned, 1], "rX")
+        self._free_artist, = self.ax.plot(positions[~pinned, 0], positions[~pinned, 1], "ko")
+        self._node_labels = []
+        if label_nodes:
+            for node, position in zip(self.tensegrity.nodes, positions):
+                self._node_labels.append(self.ax.annotate(node.name, tuple(position), (.2, .2), textcoords="offset fontsize"))
+
+        self._connection_labels = []
+        self._label_forces = label_forces
+        if label_forces or label_connections:
+            midpoints = self._connection_midpoints(positions)
+            for c, connection in enumerate(self.tensegrity.connections):
+                text = self._connection_label(connection)
+                if text is not None:
+                    self._connection_labels.append((c, self.ax.annotate(text, tuple(midpoints[c]), ha="center")))
+
+        self.fig.canvas.draw_idle()
 
     def _plot_3d(self, label_nodes: bool = False, label_connections: bool = False, label_forces: bool = False):
         """
@@ -131,57 +158,22 @@ class Visualization:
         self.ax.set_xlabel("X")
         self.ax.set_ylabel("Y")
         self.ax.set_zlabel("Z")
-        color_index = 1 # Using "CN" color cycle
-        color_names = {}
 
         # --- plot nodes ---
-        for node in self.tensegrity.nodes:
-            if node.name in self.tensegrity.pins:
-                self.ax.plot3D(*node.position, "rX")
-            else:
-                self.ax.plot3D(*node.position, "ko")
-
-            if label_nodes:
-                self.ax.text(*node.position, node.name)
+        positions = self._node_positions()
+        self._plot_nodes_3d(positions, label_nodes)
 
         # --- Plot connections ---
-        for connection in self.tensegrity.connections:
-            # Strings are dashed lines
-            if connection.connection_type == Connection.ConnectionType.STRING:
-                # Set color
-                color = "k"
-                if connection.name or len(connection.nodes) > 2:
-                    color = f"C{color_index}"
-                    if connection.name:
-                        color_names[connection.name] = color_index
-                    color_index += 1
-
-                style = "--" if connection.force > 1e-3 else ":"
-                # Plot line
-                positions = np.array([node.position for node in connection.nodes])
-                self.ax.plot3D(positions[:, 0], positions[:, 1], positions[:, 2], f"{color}{style}")
-
-            # Bars are solid lines
-            elif connection.connection_type == Connection.ConnectionType.BAR:
-                style = "-" if np.abs(connection.force) > 1e-3 else "-."
-                for i in range(len(connection.nodes)-1):
-                    positions = np.array([node.position for node in connection.nodes])
-                    self.ax.plot3D(positions[:, 0], positions[:, 1], positions[:, 2], f"k{style}")
+        # All connections are drawn by one collection, strings are dashed lines and bars are solid lines
+        colors, styles = self._segment_styles()
+        self._line_coll = Line3DCollection(self._segments(), colors=colors, linestyles=styles)
+        self.ax.add_collection3d(self._line_coll)
 
         # --- label ---
-        if label_forces:
-            for connection in self.tensegrity.connections:
-                if connection.name:
-                    self.ax.text(*(connection.nodes[0].position + connection.nodes[1].position)/2, f"{connection.name}: {connection.force:.2f}")
-                else:
-                    self.ax.text(*(connection.nodes[0].position + connection.nodes[1].position)/2, f"{connection.force:.2f}")
-        elif label_connections:
-            for connection in self.tensegrity.connections:
-                if connection.name:
-                    self.ax.text(*(connection.nodes[0].position + connection.nodes[1].position)/2, connection.name)
+        self._label_connections_3d(positions, label_connections, label_forces)
 
         self.set_3d_equal_scaling(self.ax)
-        self.fig.show()
+        self.fig.canvas.draw_idle()
 
     def _plot_2_5d(self, label_nodes: bool = False, label_connections: bool = False, label_forces: bool = False):
         """
@@ -197,96 +189,251 @@ class Visualization:
         self.ax.set_xlabel("X")
         self.ax.set_ylabel("Y")
         self.ax.set_zlabel("Z")
-        color_index = 1 # Using "CN" color cycle
-        color_names = {}
-
-        def transform(x, y, z=0):
-            if self.tensegrity.surface:
-                if self.tensegrity.surface.shape["surface_type"] == "cylinder":
-                    self.r = self.tensegrity.surface.shape["properties"]["radius"]
-                    return np.array([self.r*np.cos(x/self.r), self.r*np.sin(x/self.r), y])
-            return np.array([x, y, z]) # Default to no transformation
 
         # --- plot nodes ---
-        for node in self.tensegrity.nodes:
-            if node.name in self.tensegrity.pins:
-                self.ax.plot3D(*transform(*node.position), "rX")
-            else:
-                self.ax.plot3D(*transform(*node.position), "ko")
-
-            if label_nodes:
-                self.ax.text(*transform(*node.position), node.name)
+        positions = self._node_positions()
+        self._plot_nodes_3d(positions, label_nodes)
 
         # --- Plot connections ---
-        for connection in self.tensegrity.connections:
-            # Strings are dashed lines
-            if connection.connection_type == Connection.ConnectionType.STRING:
-                # Set color
-                color = "k"
-                if connection.name or len(connection.nodes) > 2:
-                    color = f"C{color_index}"
-                    if connection.name:
-                        color_names[connection.name] = color_index
-                    color_index += 1
-
-                style = "--" if connection.force > 1e-3 else ":"
-                # Plot line
-                # calculate all the points along the line before the transform
-                for i in range(len(connection.nodes)-1):
-                    # if nodes are linked nodes, continue
-                    if {connection.nodes[i].name, connection.nodes[i+1].name} in self.tensegrity.surface.linked_nodes:
-                        continue
-                    t_values = np.linspace(0, 1, 100)
-                    positions = np.array([connection.nodes[i].position, connection.nodes[i+1].position])
-                    positions = positions[0] + t_values[:, None] * (positions[1] - positions[0])
-                    positions = transform(positions[:, 0], positions[:, 1])
-                    self.ax.plot3D(positions[0], positions[1], positions[2], f"{color}{style}")
-
-            # Bars are solid lines
-            elif connection.connection_type == Connection.ConnectionType.BAR:
-                style = "-" if np.abs(connection.force) > 1e-3 else "-."
-                for i in range(len(connection.nodes)-1):
-                    t_values = np.linspace(0, 1, 100)
-                    positions = np.array([node.position for node in connection.nodes])
-                    positions = positions[0] + t_values[:, None] * (positions[1] - positions[0])
-                    positions = transform(positions[:, 0], positions[:, 1])
-
-                    self.ax.plot3D(positions[0], positions[1], positions[2], f"k{style}")
+        # The points along all segments are transformed in one call and drawn by one collection
+        colors, styles = self._segment_styles()
+        self._line_coll = Line3DCollection(self._segments(), colors=colors, linestyles=styles)
+        self.ax.add_collection3d(self._line_coll)
 
         # --- label ---
-        if label_forces:
-            for connection in self.tensegrity.connections:
-                if connection.name:
-                    self.ax.text(*(transform(*connection.nodes[0].position) + transform(*connection.nodes[1].position))/2, f"{connection.name}: {connection.force:.2f}")
-                else:
-                    self.ax.text(*(transform(*connection.nodes[0].position) + transform(*connection.nodes[1].position))/2, f"{connection.force:.2f}")
-        elif label_connections:
-            for connection in self.tensegrity.connections:
-                if connection.name:
-                    self.ax.text(*(transform(*connection.nodes[0].position) + transform(*connection.nodes[1].position))/2, connection.name)
+        self._label_connections_3d(positions, label_connections, label_forces)
 
         # --- plot surface ---
         if self.tensegrity.surface:
-            if self.tensegrity.surface.shape["surface_type"] == "cylinder":
-                r = self.tensegrity.surface.shape["properties"]["radius"]
-                z_max = -np.inf
-                z_min = np.inf
-                for node in self.tensegrity.nodes:
-                    if transform(*node.position)[2] > z_max:
-                        z_max = transform(*node.position)[2]
-                    if transform(*node.position)[2] < z_min:
-                        z_min = transform(*node.position)[2]
+            if self.tensegrity.surface.surface_type is Surface.SurfaceType.CYLINDER:
+                r = self.tensegrity.surface.radius
+                z_max = positions[:, 2].max() # positions are the transformed node positions
+                z_min = positions[:, 2].min()
                 resolution = 100 # Number of points to plot
                 z_min = z_min - 0.2*(z_max - z_min)
                 z_max = z_max + 0.2*(z_max - z_min)
                 z = np.linspace(z_min, z_max, resolution)
                 theta = np.linspace(0, 2*np.pi, resolution)
-                theta_grid, z_grid = np.meshgrid(theta, z)
-                x_grid = r*np.cos(theta_grid)
-                y_grid = r*np.sin(theta_grid)
+                # The x and y of the mesh only depend on theta and the z only on z, so the 1D arrays are broadcast to the grid
+                x_grid = np.broadcast_to(r*np.cos(theta), (resolution, resolution))
+                y_grid = np.broadcast_to(r*np.sin(theta), (resolution, resolution))
+                z_grid = np.broadcast_to(z[:, None], (resolution, resolution))
                 self.ax.plot_surface(x_grid, y_grid, z_grid, alpha=0.25, color="gray")
         self.set_3d_equal_scaling(self.ax)
-        self.fig.show()
+        self.fig.canvas.draw_idle()
+
+    def update(self):
+        """
+        Updates the last plot to the current node positions and connection forces.
+        The artists of the plot are moved instead of plotting everything again, which is much faster for interactive use.
+        Plots with no labels if nothing has been plotted yet.
+        """
+        if self._line_coll is None:
+            self.plot()
+            return
+
+        positions = self._node_positions()
+        pinned = self._pinned_mask()
+
+        # --- connections ---
+        colors, styles = self._segment_styles()
+        self._line_coll.set_segments(self._segments())
+        self._line_coll.set_color(colors)
+        self._line_coll.set_linestyle(styles)
+
+        # --- nodes and labels ---
+        if self.dim == 2:
+            self._pin_artist.set_data(positions[pinned, 0], positions[pinned, 1])
+            self._free_artist.set_data(positions[~pinned, 0], positions[~pinned, 1])
+            for label, position in zip(self._node_labels, positions):
+                label.xy = tuple(position)
+            self.ax.relim()
+            self.ax.autoscale_view()
+        else:
+            # The 3D axes keep their limits, so the view the user rotated to is not reset
+            self._pin_artist.set_data_3d(*positions[pinned].T)
+            self._free_artist.set_data_3d(*positions[~pinned].T)
+            for label, position in zip(self._node_labels, positions):
+                label.set_position_3d(position)
+
+        midpoints = self._connection_midpoints(positions) if self._connection_labels else None
+        for c, label in self._connection_labels:
+            if self.dim == 2:
+                label.xy = label.xyann = tuple(midpoints[c]) # the text is at xyann, not xy, when the label has no offset
+            else:
+                label.set_position_3d(midpoints[c])
+            label.set_text(self._connection_label(self.tensegrity.connections[c]))
+
+        self.fig.canvas.draw_idle()
+
+    def _plot_nodes_3d(self, positions: np.ndarray, label_nodes: bool):
+        """
+        Plots the nodes on the 3D axes, pinned nodes are red Xs and free nodes are black dots.
+
+        Args:
+            positions (np.ndarray): The (n_nodes, 3) positions of the nodes in the plot.
+            label_nodes (bool): Whether to label the node names in the plot.
+        """
+        pinned = self._pinned_mask()
+        self._pin_artist, = self.ax.plot3D(*positions[pinned].T, "rX")
+        self._free_artist, = self.ax.plot3D(*positions[~pinned].T, "ko")
+
+        self._node_labels = []
+        if label_nodes:
+            for node, position in zip(self.tensegrity.nodes, positions):
+                self._node_labels.append(self.ax.text(*position, node.name))
+
+    def _label_connections_3d(self, positions: np.ndarray, label_connections: bool, label_forces: bool):
+        """
+        Labels the connections on the 3D axes, between their first two nodes.
+
+        Args:
+            positions (np.ndarray): The (n_nodes, 3) positions of the nodes in the plot.
+            label_connections (bool): Whether to label the connection names in the plot.
+            label_forces (bool): Whether to label the forces on the connections.
+        """
+        self._connection_labels = []
+        self._label_forces = label_forces
+        if label_forces or label_connections:
+            midpoints = self._connection_midpoints(positions)
+            for c, connection in enumerate(self.tensegrity.connections):
+                text = self._connection_label(connection)
+                if text is not None:
+                    self._connection_labels.append((c, self.ax.text(*midpoints[c], text)))
+
+    def _connection_midpoints(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Computes where the connection labels are placed, between the first two nodes of each connection.
+
+        Args:
+            positions (np.ndarray): The positions of the nodes in the plot (see _node_positions).
+
+        Returns:
+            np.ndarray: The label position of each connection, in the order of tensegrity.connections.
+        """
+        return 0.5*(positions[self._conn_first] + positions[self._conn_second])
+
+    def _connection_label(self, connection: Connection):
+        """
+        Returns the label of a connection: its name and force when labeling forces, otherwise its name (None if it has no name).
+
+        Args:
+            connection (Connection): The connection to label.
+        """
+        if self._label_forces:
+            if connection.name:
+                return f"{connection.name}: {connection.force:.2f}"
+            return f"{connection.force:.2f}"
+        return connection.name
+
+    def _transform(self, x, y, z=0.0) -> np.ndarray:
+        """
+        Transforms 2.5D coordinates to 3D, a cylinder surface wraps the x-coord around the cylinder.
+        Works on scalars and arrays.
+
+        Returns:
+            np.ndarray: The transformed coordinates, xyz is the last axis.
+        """
+        surface = self.tensegrity.surface
+        if surface and surface.surface_type is Surface.SurfaceType.CYLINDER:
+            r = surface.radius
+            return np.stack([r*np.cos(x/r), r*np.sin(x/r), y], axis=-1)
+        return np.stack(np.broadcast_arrays(x, y, z), axis=-1) # Default to no transformation
+
+    def _node_positions(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The positions of the nodes in the plot (transformed in 2.5D), in the order of tensegrity.nodes.
+        """
+        if self.dim == 2:
+            return self.tensegrity.positions[:, :2]
+        if self.dim == 2.5:
+            return self._transform(*self.tensegrity.positions.T)
+        return self.tensegrity.positions
+
+    def _segments(self):
+        """
+        Returns the lines of the connection collection.
+        In 2D and 3D this is the polyline through the nodes of each connection. In 2.5D every visible segment
+        is drawn as 100 points along the straight line between its nodes (before the transform).
+        """
+        if self.dim != 2.5:
+            return self._connection_segments(self._node_positions())
+
+        shown = ~self._seg_hidden
+        segment_starts = self.tensegrity.positions[self._seg_start[shown], None, :2]
+        segment_ends = self.tensegrity.positions[self._seg_end[shown], None, :2]
+        segments = np.multiply(segment_ends - segment_starts, self._t_values, out=self._seg_buf) # (K, 100, 2)
+        segments += segment_starts
+        return self._transform(segments[..., 0], segments[..., 1]) # (K, 100, 3)
+
+    def _segment_styles(self):
+        """
+        Returns the colors and line styles of the lines returned by _segments (see _connection_styles).
+        """
+        colors, styles = self._connection_styles()
+        if self.dim != 2.5:
+            return colors, styles
+        segment_conn = self._seg_conn[~self._seg_hidden]
+        return colors[segment_conn], styles[segment_conn]
+
+    def _connection_segments(self, positions: np.ndarray) -> List[np.ndarray]:
+        """
+        Gathers the positions of the nodes of every connection.
+
+        Args:
+            positions (np.ndarray): The positions of all nodes, in the order of tensegrity.nodes.
+
+        Returns:
+            List[np.ndarray]: The positions of the nodes of each connection, in the order of tensegrity.connections.
+        """
+        return np.split(positions[self._conn_rows], self._conn_splits)
+
+    def _connection_colors(self) -> np.ndarray:
+        """
+        Returns the color of each connection.
+        Named strings and strings with more than two nodes get their own color from the "CN" color cycle, everything else is black.
+
+        Returns:
+            np.ndarray: The color of each connection, in the order of tensegrity.connections.
+        """
+        colors = np.full(len(self.tensegrity.connections), "k", dtype=object)
+        color_index = 1 # Using "CN" color cycle
+        for c, connection in enumerate(self.tensegrity.connections):
+            if connection.connection_type == Connection.ConnectionType.STRING and (connection.name or len(connection.nodes) > 2):
+                colors[c] = f"C{color_index}"
+                color_index += 1
+        return colors
+
+    def _recompute_styles(self):
+        """
+        Recomputes the line style of each connection from its force.
+        Strings are dashed (dotted when slack) and bars are solid (dash-dotted when unloaded).
+        """
+        connections = self.tensegrity.connections
+        forces = np.fromiter((connection.force for connection in connections), dtype=float, count=len(connections))
+        string_styles = np.where(forces > 1e-3, "--", ":") # strings are slack at zero force
+        bar_styles = np.where(np.abs(forces) > 1e-3, "-", "-.") # bars carry tension and compression
+        self._conn_styles = np.where(self._conn_is_string, string_styles, bar_styles).astype(object)
+        self._styles_version = self.tensegrity.forces_version
+
+    def _connection_styles(self):
+        """
+        Returns the color and line style of each connection, the line styles are only recomputed when the forces have changed.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The colors and the line styles, in the order of tensegrity.connections.
+        """
+        if self._styles_version != self.tensegrity.forces_version:
+            self._recompute_styles()
+        return self._conn_colors, self._conn_styles
+
+    def _pinned_mask(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Boolean mask of the nodes (rows of tensegrity.positions) that are pinned.
+        """
+        return np.array([node.name in self.tensegrity.pins_set for node in self.tensegrity.nodes], dtype=bool)
 
     def set_3d_equal_scaling(self, ax):
         """
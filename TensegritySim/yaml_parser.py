@@ -2,8 +2,16 @@ from os.path import isfile
 import yaml
 import numpy as np
 
+try:
+    from yaml import CSafeLoader as _Loader # libyaml parser, much faster than the pure Python one
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
 from .data_structures import Node, Connection, Surface, Tensegrity
 
+# Connection type of each builder type in the YAML file
+CONNECTION_TYPES = {"string": Connection.ConnectionType.STRING, "bar": Connection.ConnectionType.BAR}
+
 class YamlParser:
     """
     A class for parsing YAML files and creating a Tensegrity object.
@@ -35,7 +43,7 @@ class YamlParser:
 
         with open(file, "r", encoding="utf-8") as stream:
             try:
-                data = yaml.safe_load(stream)
+                data = yaml.load(stream, Loader=_Loader)
             except yaml.YAMLError as exc:
                 print("Invalid YAML file.")
                 raise exc
@@ -44,16 +52,19 @@ class YamlParser:
             nodes = {} # Dictionary to store nodes so I can find them by name
             for node_name in data["nodes"]:
                 nodes[node_name] = Node(node_name, data["nodes"][node_name])
+            positions = np.array([node.position for node in nodes.values()], dtype=float)
+            node_rows = {node_name: i for i, node_name in enumerate(nodes)} # row of each node in positions
 
             # --- Surface ---
             surface = None
             linked_nodes = []
             if "surface" in data:
                 for node_pairs in data["surface"]["linked_nodes"]:
-                    linked_nodes.append({node_pairs[0], node_pairs[1]})
+                    linked_nodes.append((node_pairs[0], node_pairs[1]))
                 surface_type = [key for key in data["surface"].keys() if key != "linked_nodes"][0] #find the key that is not linked_nodes
                 shape = {"surface_type": surface_type, "properties": data["surface"][surface_type]}
                 surface = Surface(shape, linked_nodes)
+            linked_pairs = surface.linked_pairs if surface else set() # each linked pair as a frozenset, for constant time membership tests
 
             # --- Connections ---
             connections = [] # List to store connections used to create Tensegrity object
@@ -64,42 +75,43 @@ class YamlParser:
                 if builder_type not in data["builders"]:
                     raise KeyError(f"Builder type {builder_type} does not have a builder.")
 
-                stiffness = float(data["builders"][builder_type]["stiffness"])
-
-                if data["builders"][builder_type]["type"] == "string":
-                    connection_type = Connection.ConnectionType.STRING
-                elif data["builders"][builder_type]["type"] == "bar":
-                    connection_type = Connection.ConnectionType.BAR
-                else:
-                    raise ValueError(f"Connection type {data['builders'][builder_type]['type']} not recognized.")
-
-                if "initial_length_ratio" in data["builders"][builder_type]:
-                    initial_length_ratio = float(data["builders"][builder_type]["initial_length_ratio"])
-                else:
-                    initial_length_ratio = 1.0
+                # The builder values are the same for all its connections
+                builder = data["builders"][builder_type]
+                stiffness = float(builder["stiffness"])
+                if builder["type"] not in CONNECTION_TYPES:
+                    raise ValueError(f"Connection type {builder['type']} not recognized.")
+                connection_type = CONNECTION_TYPES[builder["type"]]
+                initial_length_ratio = float(builder.get("initial_length_ratio", 1.0))
 
-                # Create connections
+                # Name and node names of each connection of this builder
+                builder_connections = []
                 for connection in data["connections"][builder_type]:
                     if isinstance(connection, dict): # If the connection has a name
                         for name, nodes_list in connection.items():
-                            initial_length = 0
-                            for i in range(len(nodes_list) - 1):
-                                if {nodes_list[i], nodes_list[i+1]} in linked_nodes:
-                                    continue
-                                initial_length += np.linalg.norm(nodes[nodes_list[i]].position - nodes[nodes_list[i+1]].position)
-                            initial_length *= initial_length_ratio
-
-                            connection = Connection([nodes[n_name] for n_name in nodes_list], connection_type, stiffness, initial_length, name)
-                            connections.append(connection)
-                            connection_names[name] = connection
+                            builder_connections.append((name, nodes_list))
                     else:
-                        initial_length = 0
-                        for i in range(len(connection) - 1):
-                            if {connection[i], connection[i+1]} in linked_nodes:
-                                continue
-                            initial_length += np.linalg.norm(nodes[connection[i]].position - nodes[connection[i+1]].position)
-                        initial_length *= initial_length_ratio
-                        connections.append(Connection([nodes[n_name] for n_name in connection], connection_type, stiffness, initial_length))
+                        builder_connections.append((None, connection))
+
+                # Initial lengths: the lengths of all segments (except between linked nodes) are computed at once
+                # and summed into the connection they belong to
+                starts, ends, connection_ids = [], [], []
+                for c, (name, nodes_list) in enumerate(builder_connections):
+                    for i in range(len(nodes_list) - 1):
+                        if frozenset((nodes_list[i], nodes_list[i+1])) in linked_pairs:
+                            continue
+                        starts.append(node_rows[nodes_list[i]])
+                        ends.append(node_rows[nodes_list[i+1]])
+                        connection_ids.append(c)
+                segment_lengths = np.linalg.norm(positions[np.array(starts, dtype=int)] - positions[np.array(ends, dtype=int)], axis=1)
+                initial_lengths = np.bincount(np.array(connection_ids, dtype=int), weights=segment_lengths, minlength=len(builder_connections))
+                initial_lengths *= initial_length_ratio
+
+                # Create connections
+                for (name, nodes_list), initial_length in zip(builder_connections, initial_lengths):
+                    connection = Connection([nodes[n_name] for n_name in nodes_list], connection_type, stiffness, float(initial_length), name)
+                    connections.append(connection)
+                    if name:
+                        connection_names[name] = connection
 
             # --- Pins ---
             pins = {}
@@ -1,4 +1,5 @@
 import argparse
+import matplotlib.pyplot as plt
 
 from TensegritySim import YamlParser, Visualization, TensegritySolver
 
@@ -6,7 +7,8 @@ def main(file):
     # Load the tensegrity system from the YAML file
     tensegrity_system = YamlParser.parse(file)
 
-    # Create the visualization object
+    # Create the visualization object, in interactive mode so the plot is redrawn while waiting for input
+    plt.ion()
     viz = Visualization(tensegrity_system)
 
     # Plot the initial tensegrity system
@@ -16,7 +18,7 @@ def main(file):
     solver = TensegritySolver(tensegrity_system)
     solver.solve()
     
-    viz.plot(label_nodes=True, label_connections=True)
+    viz.update()
 
     show_forces = False
 
@@ -29,6 +31,7 @@ def main(file):
         print(f"Enter changes in length to control strings as comma-separated values in the order of: {tensegrity_system.get_control_order()} to update simulation.")
 
     while True:
+        plt.pause(0.001) # let the figure process the pending redraw before blocking on input
         user_input = input("Input: ")
         if user_input == "q":
             break
@@ -44,7 +47,7 @@ def main(file):
             tensegrity_system.change_control_lengths(*delta_lengths)
 
         solver.solve()
-        viz.plot(label_nodes=True, label_connections=True, label_forces=show_forces)
+        viz.update()
 
 
 if __name__ == "__main__":
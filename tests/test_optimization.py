@@ -1,11 +1,14 @@
-import pytest
-import sys
+import copy
 import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pytest
 
 import numpy as np
-from src.data_structures import Connection, Node, Tensegrity
-from tensegrity_solver import TensegritySolver
+from scipy import sparse
+from TensegritySim.yaml_parser import YamlParser
+from TensegritySim.data_structures import Connection, Node, Surface, Tensegrity
+from TensegritySim.tensegrity_solver import TensegritySolver
+
+YAML_DIR = os.path.join(os.path.dirname(__file__), "..", "yaml")
 
 
 @pytest.fixture
@@ -85,4 +88,153 @@ def test_spring_connection_energy(OnexOne_tensegrity):
     # current length is 1.0
     energy3 = solver._spring_connection_energy(connection3, N)
     expected_energy3 = 0 # string connection cannot be compressed
-    assert energy3 == expected_energy3, f"Expected energy {expected_energy3}, but got {energy3}"
\ No newline at end of file
+    assert energy3 == expected_energy3, f"Expected energy {expected_energy3}, but got {energy3}"
+
+
+def test_total_energy(OnexOne_tensegrity):
+    solver = TensegritySolver(OnexOne_tensegrity)
+    N = np.array([node.position for node in OnexOne_tensegrity.nodes])
+    N += np.random.default_rng(0).normal(scale=0.1, size=N.shape)
+
+    # The total energy is the sum of the energy of each connection
+    total_energy = solver._total_energy(N)
+    expected_energy = sum(solver._spring_connection_energy(connection, N) for connection in OnexOne_tensegrity.connections)
+    assert np.isclose(total_energy, expected_energy), f"Expected energy {expected_energy}, but got {total_energy}"
+
+
+def assert_jacobian_matches_finite_differences(solver, x, **tolerances):
+    jacobian = solver._jacobian(x)
+    if sparse.issparse(jacobian):
+        jacobian = jacobian.toarray()
+
+    h = 1e-6
+    expected = np.array([(solver._objective(x + h*e) - solver._objective(x - h*e)) / (2*h) for e in np.eye(len(x))]).T
+    assert np.allclose(jacobian, expected, **tolerances), f"Expected jacobian {expected}, but got {jacobian}"
+
+
+def test_jacobian(OnexOne_tensegrity):
+    solver = TensegritySolver(OnexOne_tensegrity)
+
+    # Perturb the nodes so the connections are stretched and compressed (including a slack string)
+    x = solver._create_initial_guess() + np.array([0.05, -0.02, 0.01, 0.03, 0.1, -0.04, 0.02, 0.0, -0.05, 0.02, -0.01, 0.03])
+
+    assert_jacobian_matches_finite_differences(solver, x, atol=1e-5)
+
+
+def test_jacobian_cylinder():
+    # Pinned nodes and linked nodes on a cylinder exercise the folding of the virtual work and the surface constraints
+    tensegrity = YamlParser.parse(os.path.join(YAML_DIR, "6-box-cylinder.yaml"))
+    solver = TensegritySolver(tensegrity)
+    assert len(solver.fold_src) > 0 and not solver.free_mask.all()
+
+    x = solver._create_initial_guess()
+    x += np.random.default_rng(0).normal(scale=0.01, size=x.shape)
+
+    assert_jacobian_matches_finite_differences(solver, x, rtol=1e-6, atol=1e-4)
+
+
+def test_jacobian_sparse():
+    # Large problems get the sparse Jacobian, force it for a small one with pins and linked nodes
+    tensegrity = YamlParser.parse(os.path.join(YAML_DIR, "6-box-cylinder.yaml"))
+    solver = TensegritySolver(tensegrity)
+    solver.KRYLOV_SIZE = 0
+
+    x = solver._create_initial_guess()
+    x += np.random.default_rng(0).normal(scale=0.01, size=x.shape)
+
+    assert sparse.issparse(solver._jacobian(x))
+    assert_jacobian_matches_finite_differences(solver, x, rtol=1e-6, atol=1e-4)
+
+
+def test_reduce_virtual_work_chained_links():
+    # A is the first node of the pair (A, B) and the second of (C, A), so the virtual work of B is folded
+    # into A and then, with the work of A, into C whatever order the pairs are listed in
+    nodes = [Node(name, position) for name, position in zip("ABCD", [[0.0, 0.0], [1.0, 0.0], [2.0, 0.0], [0.0, 1.0]])]
+    connections = [Connection(nodes=[nodes[0], nodes[3]], connection_type=Connection.ConnectionType.STRING, stiffness=1.0)]
+    for linked_nodes in ([("A", "B"), ("C", "A")], [("C", "A"), ("A", "B")]):
+        surface = Surface({"surface_type": "cylinder", "properties": {"radius": 1.0}}, linked_nodes)
+        solver = TensegritySolver(Tensegrity(nodes, connections, surface=surface))
+
+        reduced = solver._reduce_virtual_work(np.arange(1.0, 9.0))
+        assert np.array_equal(reduced, [9.0, 12.0, 7.0, 8.0]), f"Expected [9, 12, 7, 8], but got {reduced}"
+
+
+def test_cylinder_without_radius():
+    with pytest.raises(ValueError):
+        Surface({"surface_type": "cylinder", "properties": {}}, [])
+
+
+def test_float32_dtype():
+    tensegrity64 = YamlParser.parse(os.path.join(YAML_DIR, "6-box-cylinder.yaml"))
+    tensegrity32 = YamlParser.parse(os.path.join(YAML_DIR, "6-box-cylinder.yaml"))
+    solver64 = TensegritySolver(tensegrity64)
+    solver32 = TensegritySolver(tensegrity32, dtype=np.float32)
+
+    # The objective assembled in float32 matches the float64 one to float32 precision
+    x = solver64._create_initial_guess()
+    x += np.random.default_rng(0).normal(scale=0.01, size=x.shape)
+    objective64 = solver64._objective(x)
+    objective32 = solver32._objective(x)
+    tolerance = 100*np.finfo(np.float32).eps*np.abs(objective64).max()
+    assert np.allclose(objective32, objective64, rtol=0, atol=tolerance), f"Expected objective {objective64}, but got {objective32}"
+
+    # Solving in float32 converges to the float64 solution
+    tensegrity64.change_control_lengths(-0.1)
+    tensegrity32.change_control_lengths(-0.1)
+    solver64.solve()
+    solver32.solve()
+    assert np.allclose(tensegrity32.positions, tensegrity64.positions, rtol=0, atol=1e-4), f"Expected positions {tensegrity64.positions}, but got {tensegrity32.positions}"
+
+
+def test_solve_non_square(tmp_path):
+    # Pinning both nodes of a linked pair (Node1 and Node7) keeps their surface constraints but removes no virtual work,
+    # so the objective has more equations than unknowns and only a least squares method can solve it
+    with open(os.path.join(YAML_DIR, "6-box-cylinder.yaml"), encoding="utf-8") as file:
+        yaml = file.read().replace("pin:\n", "pin:\n  Node7: [True, True, False]\n")
+    (tmp_path / "pinned-seam.yaml").write_text(yaml, encoding="utf-8")
+    tensegrity = YamlParser.parse(str(tmp_path / "pinned-seam.yaml"))
+
+    solver = TensegritySolver(tensegrity)
+    assert solver._n_objective > len(solver._create_initial_guess())
+
+    solver.solve()
+    residual = np.linalg.norm(solver._objective(solver._create_initial_guess()))
+    assert residual < 1e-2, f"Expected the solve to converge, but the residual is {residual}"
+
+
+def test_solve_stiffness_change():
+    tensegrity = YamlParser.parse(os.path.join(YAML_DIR, "1-box.yaml"))
+    expected = copy.deepcopy(tensegrity)
+    solver = TensegritySolver(tensegrity)
+
+    # A stiffness changed after the solver was created is used by the next solve
+    for t in (tensegrity, expected):
+        t.connections[0].stiffness *= 10
+        t.change_control_lengths(-0.2)
+    solver.solve()
+    TensegritySolver(expected).solve()
+    assert np.allclose(tensegrity.positions, expected.positions), f"Expected positions {expected.positions}, but got {tensegrity.positions}"
+
+
+def test_reset_positions():
+    tensegrity = YamlParser.parse(os.path.join(YAML_DIR, "1-box.yaml"))
+    tensegrity.change_control_lengths(-0.2)
+    TensegritySolver(tensegrity).solve()
+
+    # Replacing the positions array writes into it, so the nodes see the reset
+    tensegrity.positions = tensegrity.original_positions.copy()
+    node_positions = np.array([node.position for node in tensegrity.nodes])
+    assert np.array_equal(node_positions, tensegrity.original_positions), f"Expected {tensegrity.original_positions}, but got {node_positions}"
+
+
+def test_deepcopy_solve():
+    tensegrity = YamlParser.parse(os.path.join(YAML_DIR, "1-box.yaml"))
+    copied = copy.deepcopy(tensegrity)
+    copied.change_control_lengths(-0.2)
+    TensegritySolver(copied).solve()
+
+    # The nodes of the copy follow the solved positions of the copy, the original is unchanged
+    node_positions = np.array([node.position for node in copied.nodes])
+    assert np.array_equal(node_positions, copied.positions), f"Expected {copied.positions}, but got {node_positions}"
+    assert not np.allclose(copied.positions, copied.original_positions), "Expected the copy to move"
+    assert np.array_equal(tensegrity.positions, tensegrity.original_positions), "Expected the original to be unchanged"